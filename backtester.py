@@ -4,13 +4,15 @@ import difflib
 from datetime import datetime, timedelta
 import os
 import time
-import requests
 import io
+import argparse
+from functools import partial
 
-# Just load the config file
-def load_config(config_path='config.json'):
-    with open(config_path, 'r') as f:
-        return json.load(f)
+import clustering
+import flow_store
+import sharding
+from settings import load_config
+from sec_data import get_sec_ticker_map
 
 # Fuzzy Match Attempt
 # This is kinda hacky but works for most big companies.
@@ -49,45 +51,6 @@ def clean_company_name(name):
     name = name.replace(',', '').replace('.', '').replace('-', ' ').replace('&', ' ')
     return ' '.join(name.split()) # Remove extra whitespace
 
-# --- SEC Ticker Mapping ---
-SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
-SEC_MAP_FILE = "sec_tickers.json"
-
-def get_sec_ticker_map():
-    """
-    Grabs the ticker map from SEC.gov because mapping names manually is a nightmare.
-    Caches it locally so we don't get IP banned.
-    """
-    if os.path.exists(SEC_MAP_FILE):
-        try:
-            with open(SEC_MAP_FILE, 'r') as f:
-                print("Loading ticker map from local cache...")
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading local ticker map: {e}")
-
-    print("Fetching ticker map from SEC.gov...")
-    headers = {'User-Agent': 'Mozilla/5.0 (Company; mail@example.com)'} # SEC requires a User-Agent
-    try:
-        response = requests.get(SEC_TICKERS_URL, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Convert SEC format {"0": {...}, "1": {...}} to {"AAPL": "Apple Inc.", ...}
-        ticker_map = {}
-        for key in data:
-            entry = data[key]
-            ticker_map[entry['ticker']] = entry['title']
-            
-        # Save to cache
-        with open(SEC_MAP_FILE, 'w') as f:
-            json.dump(ticker_map, f)
-            
-        return ticker_map
-    except Exception as e:
-        print(f"Error fetching SEC data: {e}")
-        return {}
-
 # --- Stooq Price Data ---
 def get_price_data(ticker, start_date, end_date):
     """
@@ -99,6 +62,8 @@ def get_price_data(ticker, start_date, end_date):
     stooq_ticker = f"{ticker}.US"
     url = f"https://stooq.com/q/d/l/?s={stooq_ticker}&i=d"
     
+    import requests
+
     try:
         # Read CSV directly from URL
         # Stooq returns a CSV with headers: Date,Open,High,Low,Close,Volume
@@ -143,11 +108,14 @@ def get_price_data(ticker, start_date, end_date):
         # print(f"Error fetching price for {ticker}: {e}")
         return None
 
+OPTIONS_FILE = 'Trady Flow - Best Options Trade Ideas.csv'
+STUDIES_FILE = 'ctg-studies.csv'
+
 def load_data():
     print("Loading data...")
     try:
-        options_df = pd.read_csv('Trady Flow - Best Options Trade Ideas.csv')
-        studies_df = pd.read_csv('ctg-studies.csv')
+        options_df = pd.read_csv(OPTIONS_FILE)
+        studies_df = pd.read_csv(STUDIES_FILE)
     except Exception as e:
         print(f"Error loading CSV files: {e}")
         return None, None
@@ -160,39 +128,30 @@ def load_data():
     
     return options_df, studies_df
 
-def run_backtest():
-    config = load_config()
-    options_df, studies_df = load_data()
-    ticker_map = get_sec_ticker_map()
-    
-    if options_df is None or studies_df is None:
-        return
-
-    print("Starting Backtest...")
-    
-    results = []
-    
-    def parse_value(x):
-        if isinstance(x, str):
-            x = x.replace(',', '')
-            if 'K' in x:
-                return float(x.replace('K', '')) * 1000
-            if 'M' in x:
-                return float(x.replace('M', '')) * 1000000
-        return float(x)
-
-    options_df['Vol_Num'] = options_df['Vol'].apply(parse_value)
-    options_df['Prems_Num'] = options_df['Prems'].apply(parse_value)
-
-    filtered_options = options_df[
+def apply_thresholds(options_df, config):
+    return options_df[
         (options_df['Vol_Num'] >= config['volume_threshold']) & 
         (options_df['Prems_Num'] >= config['premium_threshold'])
     ]
-    
-    print(f"Processing {len(filtered_options)} potential option trades...")
-    
-    valid_studies = studies_df.dropna(subset=['Primary Completion Date', 'Sponsor'])
-    
+
+def filter_options(options_df, config):
+    # assign() instead of setting columns, options_df may be a shard's slice of the flow.
+    # Same parser as the store ingest so both paths see the same numbers.
+    options_df = options_df.assign(
+        Vol_Num=options_df['Vol'].apply(flow_store.parse_value),
+        Prems_Num=options_df['Prems'].apply(flow_store.parse_value),
+    )
+
+    # Collapse sweeps into orders first so the thresholds apply to the whole order
+    orders = clustering.cluster_prints(options_df, config.get('cluster_gap_minutes', 0))
+    return apply_thresholds(orders, config)
+
+def backtest_trades(filtered_options, valid_studies, ticker_map, config):
+    """
+    Runs catalyst matching + the Stooq simulation over the given option trades.
+    Returns a list of (row_index, result) so sharded runs can be put back in order.
+    """
+    results = []
     processed_count = 0
     
     for index, row in filtered_options.iterrows():
@@ -264,7 +223,7 @@ def run_backtest():
                     
                     trade_pnl = config['initial_capital'] * config['trade_size_percent'] * pnl_pct
                     
-                    results.append({
+                    results.append((index, {
                         'Ticker': ticker,
                         'Date': trade_date,
                         'Type': row['C/P'],
@@ -274,7 +233,7 @@ def run_backtest():
                         'PnL%': pnl_pct * 100,
                         'Catalyst': matched_study['NCT Number'],
                         'Study Title': matched_study['Study Title']
-                    })
+                    }))
                     
                     print(f"  -> Trade Result: {pnl_pct*100:.2f}%")
                 else:
@@ -283,18 +242,152 @@ def run_backtest():
             except Exception as e:
                 print(f"  -> Error simulating trade: {e}")
 
+    return results
+
+def run_backtest_shard(shard_index=0, num_shards=1, config=None):
+    """
+    Loads everything and backtests only the tickers that hash into this shard.
+    With num_shards=1 that's just the whole flow.
+    """
+    if config is None:
+        config = load_config()
+    options_df, studies_df = load_data()
+    ticker_map = get_sec_ticker_map()
+    
+    if options_df is None or studies_df is None:
+        return []
+
+    print("Starting Backtest..." if num_shards == 1 else f"Starting Backtest (shard {shard_index + 1}/{num_shards})...")
+
+    # Orders never span more than one Sym, so each shard only has to cluster its own tickers
+    filtered_options = filter_options(sharding.partition(options_df, num_shards, shard_index), config)
+    
+    print(f"Processing {len(filtered_options)} potential option trades...")
+    
+    valid_studies = studies_df.dropna(subset=['Primary Completion Date', 'Sponsor'])
+    
+    return backtest_trades(filtered_options, valid_studies, ticker_map, config)
+
+def save_results(results, output_path='backtest_results.csv'):
+    """
+    Prints and saves the results. Returns the total PnL (0 if nothing traded).
+    """
     # Output Results
     if results:
         results_df = pd.DataFrame(results)
         print("\n--- Backtest Results ---")
         print(results_df[['Ticker', 'Date', 'Type', 'PnL', 'PnL%']])
-        results_df.to_csv('backtest_results.csv', index=False)
-        print("Results saved to backtest_results.csv")
+        results_df.to_csv(output_path, index=False)
+        print(f"Results saved to {output_path}")
         
         total_pnl = results_df['PnL'].sum()
         print(f"\nTotal PnL: ${total_pnl:.2f}")
+        return total_pnl
+    else:
+        print("\nNo trades executed.")
+        return 0.0
+
+def run_backtest_out_of_core(store_dir, config=None, output_path='backtest_results.csv', memory_budget_mb=None):
+    """
+    Same backtest, but reads the flow from the date-partitioned store one day at a time
+    and appends results to output_path as it goes, so memory doesn't grow with history.
+    Returns (trade_count, total_pnl).
+    """
+    if config is None:
+        config = load_config()
+    if memory_budget_mb is None:
+        memory_budget_mb = config.get('memory_budget_mb', flow_store.DEFAULT_MEMORY_BUDGET_MB)
+
+    # Check this up front, the old results get wiped below
+    if not os.path.isdir(store_dir):
+        print(f"Error: no flow store at {store_dir}, build one first (cli.py build-store)")
+        return 0, 0.0
+
+    print(f"Starting Out-of-Core Backtest from {store_dir} (memory budget: {memory_budget_mb} MB)...")
+    ticker_map = get_sec_ticker_map()
+
+    # Studies are small compared to the flow, keep those in memory (only the columns we use)
+    try:
+        studies_df = pd.read_csv(STUDIES_FILE, usecols=flow_store.STUDY_COLUMNS)
+    except Exception as e:
+        print(f"Error loading CSV files: {e}")
+        return 0, 0.0
+    studies_df['Primary Completion Date'] = pd.to_datetime(studies_df['Primary Completion Date'], errors='coerce')
+    valid_studies = studies_df.dropna(subset=['Primary Completion Date', 'Sponsor'])
+    del studies_df
+
+    studies_mb = valid_studies.memory_usage(deep=True).sum() / (1024 * 1024)
+    if studies_mb > memory_budget_mb * (1 - flow_store.BATCH_BUDGET_FRACTION):
+        print(f"Error: studies alone take {studies_mb:.0f} MB, raise the memory budget above {memory_budget_mb} MB")
+        return 0, 0.0
+
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    trade_count = 0
+    total_pnl = 0.0
+    last_date = None
+    # With clustering on, orders have to be built from a whole trade date and the thresholds
+    # apply to the order, so the reader hands back full days (of Syms that could qualify)
+    # and we filter after clustering instead
+    gap_minutes = config.get('cluster_gap_minutes', 0)
+    batches = flow_store.iter_flow_batches(store_dir, config, memory_budget_mb, whole_days=bool(gap_minutes))
+    for trade_date, batch in batches:
+        if trade_date != last_date:
+            print(f"Processing {trade_date}...")
+            last_date = trade_date
+
+        if gap_minutes:
+            batch = apply_thresholds(clustering.cluster_prints(batch, gap_minutes), config)
+
+        results = [record for _, record in backtest_trades(batch, valid_studies, ticker_map, config)]
+        if results:
+            # Stream to disk instead of keeping everything around
+            pd.DataFrame(results).to_csv(output_path, mode='a', header=(trade_count == 0), index=False)
+            trade_count += len(results)
+            total_pnl += sum(r['PnL'] for r in results)
+
+    if trade_count:
+        print(f"\n{trade_count} trades saved to {output_path}")
+        print(f"\nTotal PnL: ${total_pnl:.2f}")
     else:
         print("\nNo trades executed.")
 
+    peak = flow_store.peak_memory_mb()
+    if peak is not None:
+        print(f"Peak process memory: {peak:.0f} MB")
+    return trade_count, total_pnl
+
+def run_backtest(args=None, config=None, output_path='backtest_results.csv'):
+    """
+    Returns the list of trade results, or None if this run only produced one shard
+    (or ran out-of-core, where results only go to disk).
+    """
+    if args is None:
+        args = argparse.Namespace(shards=1, shard_index=None, workers=None, merge=False, shard_dir=sharding.SHARD_DIR)
+
+    if getattr(args, 'store', None):
+        if args.shards != 1 or args.shard_index is not None or args.merge:
+            raise ValueError("--store runs can't be combined with sharding yet")
+        run_backtest_out_of_core(args.store, config, output_path, args.memory_budget_mb)
+        return None
+
+    if config is None:
+        config = load_config()
+    fingerprint = sharding.run_fingerprint(config, [OPTIONS_FILE, STUDIES_FILE])
+    # Ticker map gets loaded (and cached) once up front instead of by every worker at once
+    results = sharding.run_sharded(partial(run_backtest_shard, config=config), 'backtest', args,
+                                   fingerprint=fingerprint, prepare=get_sec_ticker_map)
+
+    # Only the merge step (or a plain run) writes the final results
+    if results is not None:
+        save_results(results, output_path)
+    return results
+
 if __name__ == "__main__":
-    run_backtest()
+    parser = argparse.ArgumentParser(description="Biotech catalyst options backtester")
+    sharding.add_shard_args(parser)
+    flow_store.add_store_args(parser)
+    args = parser.parse_args()
+    flow_store.check_store_args(parser, args)
+    run_backtest(args)
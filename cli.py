@@ -0,0 +1,190 @@
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import importlib
+import json
+import sys
+
+import flow_store
+import sharding
+import settings
+
+# --- Unified CLI ---
+# One entry point for all the scripts:
+#   python cli.py backtest | quiet-options | debug-matches | warm-cache | sweep | build-store | config
+# pandas/requests/difflib are only pulled in by the subcommands that actually need them
+# (via the strategy modules), so stuff like `config` or `warm-cache --check` starts instantly.
+# Add --timings to see where startup time goes.
+
+TIMINGS = []
+
+def _timed(label, start):
+    TIMINGS.append((label, time.perf_counter() - start))
+
+def lazy_import(module_name):
+    """
+    Imports a module on demand and records how long it took for --timings.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _timed(f"import {module_name}", start)
+    return module
+
+def _load_config(args, section=None):
+    start = time.perf_counter()
+    config = settings.load_config(args.config, section=section)
+    _timed("load config", start)
+    return config
+
+# --- Subcommands ---
+
+def cmd_config(args):
+    section = 'quiet_options' if args.quiet_options else None
+    print(json.dumps(_load_config(args, section=section), indent=4))
+
+def cmd_backtest(args):
+    config = _load_config(args)
+    backtester = lazy_import('backtester')
+    backtester.run_backtest(args, config=config)
+
+def cmd_quiet_options(args):
+    config = _load_config(args, section='quiet_options')
+    news_strategy = lazy_import('news_strategy')
+    news_strategy.run_strategy(args, config=config)
+
+def cmd_debug_matches(args):
+    config = _load_config(args)
+    debug = lazy_import('debug_matches')
+    debug.debug_matches(ticker=args.ticker, config=config)
+
+def cmd_warm_cache(args):
+    sec_data = lazy_import('sec_data')
+
+    if args.check:
+        for name, path, exists, size, mtime in sec_data.cache_status():
+            if exists:
+                print(f"  [ok]      {name:<22} {path} ({size / 1024:.0f} KB, {time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))})")
+            else:
+                print(f"  [missing] {name:<22} {path}")
+        return
+
+    sec_data.get_sec_ticker_map()
+    cik_map = sec_data.get_sec_ticker_map_with_cik()
+
+    # EDGAR submissions are only cached for tickers you ask for, there are way too many to grab them all
+    for ticker in args.edgar:
+        info = cik_map.get(ticker)
+        if not info:
+            print(f"  {ticker}: not in SEC ticker map, skipping")
+            continue
+        data = sec_data.load_edgar_submissions(info['cik'], save_cache=True)
+        print(f"  {ticker}: {'cached' if data is not None else 'fetch failed'} ({sec_data.edgar_cache_file(info['cik'])})")
+    print("Caches warm.")
+
+def cmd_build_store(args):
+    lazy_import('pandas')
+    flow_store.build_flow_store(args.csv, args.store, overwrite=args.overwrite)
+
+def _parse_sweep_value(raw):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+def cmd_sweep(args):
+    base_config = _load_config(args)
+    if args.param not in base_config:
+        raise SystemExit(f"Unknown config param '{args.param}'. Options: {', '.join(sorted(base_config))}")
+
+    backtester = lazy_import('backtester')
+
+    summary = []
+    for raw in args.values:
+        value = _parse_sweep_value(raw)
+        config = dict(base_config, **{args.param: value})
+        print(f"\n=== Sweep: {args.param} = {value} ===")
+        output_path = f"backtest_results_{args.param}_{raw}.csv"
+        results = backtester.run_backtest(args, config=config, output_path=output_path)
+        if results is None:
+            continue
+        total_pnl = sum(r['PnL'] for r in results)
+        summary.append((value, len(results), total_pnl, output_path))
+
+    if summary:
+        print(f"\n--- Sweep Summary ({args.param}) ---")
+        for value, trades, total_pnl, output_path in summary:
+            if trades:
+                print(f"  {str(value):>10}  trades: {trades:>4}  PnL: ${total_pnl:>10.2f}  ({output_path})")
+            else:
+                # save_results doesn't write a file when nothing traded
+                print(f"  {str(value):>10}  no trades")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Biotech catalyst / dark pool flow toolkit")
+    parser.add_argument('--config', default=settings.CONFIG_FILE, help=f"Config file (default: {settings.CONFIG_FILE})")
+    parser.add_argument('--timings', action='store_true', help="Report import and startup cost when done")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('backtest', help="Classic catalyst backtester (backtester.py)")
+    sharding.add_shard_args(p)
+    flow_store.add_store_args(p)
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser('quiet-options', help="Unusual options with no SEC news (news_strategy.py)")
+    sharding.add_shard_args(p)
+    p.set_defaults(func=cmd_quiet_options)
+
+    p = sub.add_parser('debug-matches', help="Print near-miss ticker/sponsor matches (debug_matches.py)")
+    p.add_argument('--ticker', help="Only look at this ticker's trades")
+    p.set_defaults(func=cmd_debug_matches)
+
+    p = sub.add_parser('warm-cache', help="Download the SEC ticker maps (and EDGAR filings) ahead of time")
+    p.add_argument('--check', action='store_true', help="Just show what's cached, don't download anything")
+    p.add_argument('--edgar', nargs='*', default=[], metavar='TICKER', help="Also cache EDGAR submissions for these tickers")
+    p.set_defaults(func=cmd_warm_cache)
+
+    p = sub.add_parser('sweep', help="Rerun the backtest for several values of one config param")
+    p.add_argument('param', help="Config key to sweep, e.g. holding_period_days")
+    p.add_argument('values', nargs='+', help="Values to try, e.g. 1 3 5")
+    # Each value is a full run, so only local sharding makes sense here
+    p.add_argument('--shards', type=int, default=1, help="Ticker shards per run (default: 1)")
+    p.add_argument('--workers', type=int, default=None, help="Local worker processes (default: one per core)")
+    p.set_defaults(func=cmd_sweep, shard_index=None, merge=False, shard_dir=sharding.SHARD_DIR)
+
+    p = sub.add_parser('build-store', help="Convert Trady Flow CSVs into the date-partitioned store for out-of-core runs")
+    p.add_argument('csv', nargs='+', help="Trady Flow CSV export(s), e.g. one per year")
+    p.add_argument('--store', default=flow_store.STORE_DIR, metavar='DIR', help=f"Where to write the store (default: {flow_store.STORE_DIR})")
+    p.add_argument('--overwrite', action='store_true', help="Replace an existing store")
+    p.set_defaults(func=cmd_build_store)
+
+    p = sub.add_parser('config', help="Print the effective config")
+    p.add_argument('--quiet-options', action='store_true', help="Show the quiet-options strategy config instead")
+    p.set_defaults(func=cmd_config)
+
+    return parser
+
+def print_timings(startup, total):
+    print("\n--- Timings ---", file=sys.stderr)
+    print(f"  {'cli startup':<28} {startup * 1000:8.1f} ms", file=sys.stderr)
+    for label, seconds in TIMINGS:
+        print(f"  {label:<28} {seconds * 1000:8.1f} ms", file=sys.stderr)
+    print(f"  {'total':<28} {total * 1000:8.1f} ms", file=sys.stderr)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'store', None) and args.command == 'backtest':
+        flow_store.check_store_args(parser, args)
+    startup = time.perf_counter() - _START
+    try:
+        args.func(args)
+    finally:
+        if args.timings:
+            print_timings(startup, time.perf_counter() - _START)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# --- Order Clustering ---
+# When one institution sweeps across exchanges/strikes, Trady Flow shows it as dozens of
+# prints on the same Sym and side within a few minutes. Counting each print as its own trade
+# inflates the results and makes us match / hit EDGAR / fetch prices for the same thing over
+# and over, so we collapse them into orders first.
+#
+# One sort + a shifted diff does it, no Python loops:
+# a print starts a new order unless it's the same Sym and C/P as the print before it
+# and came within `gap_minutes` of it.
+
+SUMMED_COLUMNS = ['Vol_Num', 'Prems_Num']
+# Raw text columns that don't mean anything once prints are summed up
+DROPPED_COLUMNS = ['Vol', 'Prems']
+
+def cluster_prints(options_df, gap_minutes):
+    """
+    Collapses related option prints into orders.
+    Needs Vol_Num (and Prems_Num if you want premiums summed) already parsed. Each order keeps
+    the first print's fields (so Time is when the order started), sums Vol_Num / Prems_Num
+    and counts its Prints.
+    The order's index is its first print's index, so the output stays in file order.
+    gap_minutes of 0 (or None) turns clustering off.
+    """
+    if not gap_minutes or options_df.empty:
+        return options_df
+
+    df = options_df.sort_values(['Sym', 'C/P', 'Time'], kind='mergesort')
+
+    same_leg = (df['Sym'] == df['Sym'].shift()) & (df['C/P'] == df['C/P'].shift())
+    within_gap = df['Time'].diff() <= pd.Timedelta(minutes=gap_minutes)
+    starts_order = ~(same_leg & within_gap).to_numpy()
+    order_id = starts_order.cumsum()
+    first_rows = np.flatnonzero(starts_order)
+
+    # Whole first print per order, so every field comes from the same print
+    # (a per-column 'first' would skip NaNs and mix fields from different prints)
+    orders = df.iloc[first_rows].drop(columns=[c for c in DROPPED_COLUMNS if c in df.columns])
+
+    # Only sum what's been parsed, e.g. news_strategy skips Prems_Num when clustering is off
+    summed = [c for c in SUMMED_COLUMNS if c in df.columns]
+    if summed:
+        totals = df[summed].groupby(order_id, sort=False).sum()
+        for c in summed:
+            orders[c] = totals[c].to_numpy()
+    orders['Prints'] = np.diff(np.append(first_rows, len(df)))
+
+    print(f"Clustered {len(df)} prints into {len(orders)} orders (gap: {gap_minutes} min)")
+    return orders.sort_index()
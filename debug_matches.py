@@ -4,10 +4,9 @@ import difflib
 from datetime import datetime, timedelta
 import os
 
-# Load Configuration
-def load_config(config_path='config.json'):
-    with open(config_path, 'r') as f:
-        return json.load(f)
+from backtester import filter_options
+from settings import load_config
+from sec_data import SEC_MAP_FILE
 
 # Fuzzy Match Function
 def is_similar(a, b, threshold=0.8):
@@ -34,18 +33,26 @@ def clean_company_name(name):
     return name.strip()
 
 # --- SEC Ticker Mapping ---
-SEC_MAP_FILE = "sec_tickers.json"
-
 def get_sec_ticker_map():
     if os.path.exists(SEC_MAP_FILE):
         with open(SEC_MAP_FILE, 'r') as f:
             return json.load(f)
     return {}
 
-def load_data():
+def load_data(ticker=None):
+    """
+    Loads both CSVs. With a ticker, the flow gets cut down to that Sym right after reading
+    so a single-ticker lookup doesn't parse the whole file.
+    """
     print("Loading data...")
     try:
         options_df = pd.read_csv('Trady Flow - Best Options Trade Ideas.csv')
+        if ticker:
+            options_df = options_df[options_df['Sym'] == ticker].copy()
+            if options_df.empty:
+                # Nothing to match, don't bother with the studies
+                print(f"No trades found for {ticker}.")
+                return None, None
         studies_df = pd.read_csv('ctg-studies.csv')
     except Exception as e:
         print(f"Error loading CSV files: {e}")
@@ -59,9 +66,13 @@ def load_data():
     
     return options_df, studies_df
 
-def debug_matches():
-    config = load_config()
-    options_df, studies_df = load_data()
+def debug_matches(ticker=None, config=None):
+    """
+    Prints near-miss sponsor matches. Pass a ticker to only look at that symbol's trades.
+    """
+    if config is None:
+        config = load_config()
+    options_df, studies_df = load_data(ticker)
     ticker_map = get_sec_ticker_map()
     
     if options_df is None or studies_df is None:
@@ -69,22 +80,9 @@ def debug_matches():
 
     print("Starting Debug...")
     
-    def parse_value(x):
-        if isinstance(x, str):
-            x = x.replace(',', '')
-            if 'K' in x:
-                return float(x.replace('K', '')) * 1000
-            if 'M' in x:
-                return float(x.replace('M', '')) * 1000000
-        return float(x)
-
-    options_df['Vol_Num'] = options_df['Vol'].apply(parse_value)
-    options_df['Prems_Num'] = options_df['Prems'].apply(parse_value)
-
-    filtered_options = options_df[
-        (options_df['Vol_Num'] >= config['volume_threshold']) & 
-        (options_df['Prems_Num'] >= config['premium_threshold'])
-    ]
+    # Same parsing, clustering and order-level thresholds as the backtest,
+    # so this shows exactly the rows the backtest would try to match
+    filtered_options = filter_options(options_df, config)
     
     print(f"Processing {len(filtered_options)} potential option trades...")
     
@@ -92,8 +90,9 @@ def debug_matches():
     
     processed_count = 0
     
-    # Check first 500 trades
-    for index, row in filtered_options.head(500).iterrows():
+    # Check first 500 trades (or all of them for a single ticker)
+    trades = filtered_options if ticker else filtered_options.head(500)
+    for index, row in trades.iterrows():
         processed_count += 1
         ticker = row['Sym']
         trade_date = row['Time']
@@ -0,0 +1,209 @@
+import os
+import shutil
+
+# --- Out-of-Core Flow Store ---
+# The full Trady Flow history doesn't fit in RAM anymore, so this keeps it on disk as a
+# Parquet dataset partitioned by trade date (flow_store/trade_date=YYYY-MM-DD/*.parquet).
+# Vol/Prems get parsed to numbers once at ingest time so the volume/premium filters can be
+# pushed down to the reader (it skips row groups using Parquet stats), and we only ever
+# read the columns the backtest actually uses. When prints get clustered into orders the
+# pushdown works on per-Sym daily totals instead (see iter_flow_batches).
+#
+# Needs pyarrow (`pip install pyarrow`). It's only imported when you use the store.
+
+STORE_DIR = "flow_store"
+PARTITION_COL = 'trade_date'
+FLOW_COLUMNS = ['Sym', 'Time', 'C/P', 'Vol_Num', 'Prems_Num']
+STUDY_COLUMNS = ['NCT Number', 'Study Title', 'Sponsor', 'Primary Completion Date']
+
+# Chunk size when converting the CSVs, keeps ingest itself out-of-core too
+INGEST_CHUNK_ROWS = 100_000
+# Share of the budget a single flow batch is allowed to take. The rest is headroom for
+# pandas copies during filtering/iterrows, the studies frame and the result buffer.
+BATCH_BUDGET_FRACTION = 0.25
+DEFAULT_MEMORY_BUDGET_MB = 512
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The out-of-core flow store needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+def parse_value(x):
+    # Trady Flow writes Vol/Prems like "1.2K" or "3M". The one parser everything uses
+    # (store ingest, backtester, news_strategy) so they can't drift apart.
+    if isinstance(x, str):
+        x = x.replace(',', '')
+        if 'K' in x:
+            return float(x.replace('K', '')) * 1000
+        if 'M' in x:
+            return float(x.replace('M', '')) * 1000000
+    return float(x)
+
+def build_flow_store(csv_paths, store_dir=STORE_DIR, overwrite=False, chunk_rows=INGEST_CHUNK_ROWS):
+    """
+    Converts one or more Trady Flow CSV exports into the date-partitioned store.
+    Reads the CSVs in chunks so it never holds a whole file in memory.
+    Returns the number of rows written.
+    """
+    import pandas as pd
+    pa = _require_pyarrow()
+
+    if os.path.exists(store_dir):
+        if not overwrite:
+            raise FileExistsError(f"{store_dir} already exists (use overwrite=True / --overwrite to rebuild it)")
+        shutil.rmtree(store_dir)
+
+    total_rows = 0
+    chunk_no = 0
+    for csv_path in csv_paths:
+        print(f"Ingesting {csv_path}...")
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            chunk['Time'] = pd.to_datetime(chunk['Time'])
+            chunk['Vol_Num'] = chunk['Vol'].apply(parse_value)
+            chunk['Prems_Num'] = chunk['Prems'].apply(parse_value)
+            chunk[PARTITION_COL] = chunk['Time'].dt.strftime('%Y-%m-%d')
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            pa.parquet.write_to_dataset(
+                table, store_dir,
+                partition_cols=[PARTITION_COL],
+                basename_template=f"part-{chunk_no:06d}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+            )
+            total_rows += len(chunk)
+            chunk_no += 1
+            print(f"  {total_rows} rows written...")
+
+    print(f"Flow store ready: {store_dir} ({total_rows} rows)")
+    return total_rows
+
+def list_partitions(store_dir=STORE_DIR):
+    """
+    Returns the trade dates in the store, oldest first.
+    """
+    prefix = f"{PARTITION_COL}="
+    return sorted(d[len(prefix):] for d in os.listdir(store_dir) if d.startswith(prefix))
+
+def _threshold_filter(ds, config):
+    return (ds.field('Vol_Num') >= config['volume_threshold']) & \
+           (ds.field('Prems_Num') >= config['premium_threshold'])
+
+def candidate_syms(dataset, day_filter, config):
+    """
+    Cheap first pass for a trade date: reads only Sym/Vol_Num/Prems_Num and returns
+    (Sym, row_count) for the Syms whose daily totals pass both thresholds, sorted by Sym.
+    An order can't be bigger than its Sym's daily total, so any Sym not in here can't have
+    a qualifying order that day.
+    """
+    import pyarrow.compute as pc
+
+    table = dataset.to_table(columns=['Sym', 'Vol_Num', 'Prems_Num'], filter=day_filter)
+    if table.num_rows == 0:
+        return []
+    totals = table.group_by('Sym').aggregate([('Vol_Num', 'sum'), ('Prems_Num', 'sum'), ('Sym', 'count')])
+    passing = pc.and_(pc.greater_equal(totals['Vol_Num_sum'], config['volume_threshold']),
+                      pc.greater_equal(totals['Prems_Num_sum'], config['premium_threshold']))
+    totals = totals.filter(passing)
+    return sorted(zip(totals['Sym'].to_pylist(), totals['Sym_count'].to_pylist()))
+
+def iter_flow_batches(store_dir, config, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, columns=FLOW_COLUMNS,
+                      whole_days=False):
+    """
+    Yields option trades as pandas DataFrames, one trade date at a time (oldest first),
+    split into smaller batches if a day would blow the memory budget. Only `columns` are read.
+
+    By default the volume/premium thresholds are applied per print by the reader.
+
+    With whole_days (used when prints still need clustering into orders) every batch holds
+    all of the day's rows for the Syms in it, since a day's rows are spread over several part
+    files and an order can't be built from half of them. Orders never span more than one Sym,
+    so the day gets split by Sym instead: Syms are packed into batches that fit the budget,
+    using the row counts from candidate_syms. Only a single Sym-day that's over budget on its
+    own goes over (with a warning). Per-print thresholds would drop small prints that add up
+    to a big order, so the reader only loads Syms whose daily totals pass the thresholds.
+    Orders still get split at midnight.
+    """
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    if not os.path.isdir(store_dir):
+        raise FileNotFoundError(f"No flow store at {store_dir}, build one first (cli.py build-store)")
+
+    dataset = ds.dataset(store_dir, format='parquet', partitioning='hive')
+    budget_bytes = memory_budget_mb * 1024 * 1024 * BATCH_BUDGET_FRACTION
+
+    bytes_per_row = None
+    batch_rows = None
+    for trade_date in list_partitions(store_dir):
+        day_filter = ds.field(PARTITION_COL) == trade_date
+
+        if whole_days:
+            def load_syms(syms):
+                nonlocal bytes_per_row
+                table = dataset.to_table(columns=columns, filter=day_filter & ds.field('Sym').isin(syms),
+                                         use_threads=False)
+                batch = table.to_pandas()
+                batch_bytes = batch.memory_usage(deep=True).sum()
+                if len(batch):
+                    bytes_per_row = max(bytes_per_row or 0, batch_bytes / len(batch))
+                if batch_bytes > budget_bytes:
+                    what = f"{syms[0]} alone" if len(syms) == 1 else f"{len(syms)} Syms"
+                    print(f"Warning: {what} on {trade_date} takes {batch_bytes / (1024 * 1024):.1f} MB, "
+                          f"over the per-batch budget")
+                return batch
+
+            pending, pending_rows = [], 0
+            for sym, rows in candidate_syms(dataset, day_filter, config):
+                # Until we've measured a batch we don't know the row size, so the first one is a single Sym
+                if pending and (bytes_per_row is None or (pending_rows + rows) * bytes_per_row > budget_bytes):
+                    yield trade_date, load_syms(pending)
+                    pending, pending_rows = [], 0
+                pending.append(sym)
+                pending_rows += rows
+            if pending:
+                yield trade_date, load_syms(pending)
+            continue
+
+        scanner = dataset.scanner(
+            columns=columns,
+            filter=day_filter & _threshold_filter(ds, config),
+            batch_size=batch_rows or 1024,
+            use_threads=False,  # keep batch order deterministic
+        )
+        for record_batch in scanner.to_batches():
+            if record_batch.num_rows == 0:
+                continue
+            batch = record_batch.to_pandas()
+
+            # Size the batches off the first real one we see
+            if batch_rows is None:
+                batch_rows = max(1, int(budget_bytes / max(1, batch.memory_usage(deep=True).sum() // len(batch))))
+            yield trade_date, batch
+
+def peak_memory_mb():
+    """
+    Peak RSS of this process so far, or None where the resource module isn't available (Windows).
+    """
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def add_store_args(parser):
+    parser.add_argument('--store', default=None, metavar='DIR',
+                        help=f"Run out-of-core from a date-partitioned flow store (e.g. {STORE_DIR}) instead of the CSV")
+    parser.add_argument('--memory-budget-mb', type=int, default=None,
+                        help=f"Data memory budget for --store runs (default: config memory_budget_mb or {DEFAULT_MEMORY_BUDGET_MB})")
+
+def check_store_args(parser, args):
+    # Out-of-core runs stream straight to disk, there's nothing for the shard merge to work with
+    if args.store and (args.shards != 1 or args.shard_index is not None or args.merge):
+        parser.error("--store can't be combined with --shards / --shard-index / --merge")
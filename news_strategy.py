@@ -4,61 +4,21 @@ import difflib
 from datetime import datetime, timedelta
 import os
 import time
-import requests
 import io
+import argparse
+from functools import partial
 
-# --- Configuration ---
-# You can mess with these to change sensitivity
-CONFIG = {
-    'volume_threshold': 500,
-    'premium_threshold': 10000,
-    'holding_period_days': 5,
-    'initial_capital': 10000,
-    'trade_size_percent': 0.1,
-    'fuzzy_match_threshold': 85,
-    'lookback_days_for_catalyst': 30,
-    'lookforward_days_for_catalyst': 30
-}
-
-# --- SEC & News Hacking ---
-SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
-SEC_MAP_FILE = "sec_tickers_with_cik.json"
-# Need a proper user agent or SEC blocks the request immediately
-USER_AGENT = {'User-Agent': 'RileyResearchBot/1.0 (riley.student@mit.edu)'} 
-
-def get_sec_ticker_map_with_cik():
-    """
-    Returns dict: Ticker -> {'title': str, 'cik': str}
-    """
-    if os.path.exists(SEC_MAP_FILE):
-        try:
-            with open(SEC_MAP_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
+import clustering
+import sharding
+from flow_store import parse_value
+from settings import load_config
+from sec_data import get_sec_ticker_map_with_cik, load_edgar_submissions, set_rate_limit_shards
 
-    print("Fetching ticker map from SEC.gov...")
-    try:
-        response = requests.get(SEC_TICKERS_URL, headers=USER_AGENT)
-        data = response.json()
-        
-        ticker_map = {}
-        for key in data:
-            entry = data[key]
-            # Zero-pad CIK to 10 digits for EDGAR API
-            cik_str = str(entry['cik_str']).zfill(10)
-            ticker_map[entry['ticker']] = {
-                'title': entry['title'],
-                'cik': cik_str
-            }
-            
-        with open(SEC_MAP_FILE, 'w') as f:
-            json.dump(ticker_map, f)
-            
-        return ticker_map
-    except Exception as e:
-        print(f"Error fetching SEC data: {e}")
-        return {}
+# --- Configuration ---
+# Settings live in config.json now; the "quiet_options" section overrides the
+# backtester defaults (longer holding period, wider catalyst window, bigger size).
+# You can mess with those to change sensitivity
+CONFIG_SECTION = 'quiet_options'
 
 def check_sec_filings(cik, target_date, window_hours=24):
     """
@@ -68,26 +28,10 @@ def check_sec_filings(cik, target_date, window_hours=24):
     if not cik:
         return False, []
         
-    url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-    
-    # Simple caching to avoid spamming SEC
-    cache_file = f"cache_cik_{cik}.json"
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r') as f:
-            data = json.load(f)
-    else:
-        # Rate limit compliance (SEC limit is 10 req/sec, we'll go slower just in case)
-        time.sleep(0.15)
-        try:
-            r = requests.get(url, headers=USER_AGENT)
-            if r.status_code != 200:
-                return False, []
-            data = r.json()
-            # Save cache
-            # with open(cache_file, 'w') as f: # Cache disabled for now to save disk space
-            #     json.dump(data, f)
-        except:
-            return False, []
+    # Simple caching to avoid spamming SEC (see sec_data.load_edgar_submissions)
+    data = load_edgar_submissions(cik)
+    if data is None:
+        return False, []
 
     filings = data.get('filings', {}).get('recent', {})
     if not filings:
@@ -143,6 +87,7 @@ def is_similar(a, b, threshold=0.8):
 def get_price_data(ticker, start_date, end_date):
     stooq_ticker = f"{ticker}.US"
     url = f"https://stooq.com/q/d/l/?s={stooq_ticker}&i=d"
+    import requests
     try:
         response = requests.get(url)
         if response.status_code != 200: return None
@@ -159,60 +104,53 @@ def get_price_data(ticker, start_date, end_date):
 
 # --- Main Logic ---
 
-def run_strategy():
-    print("Initializing Strategy: 'Unusual Options with NO News'...")
-    
-    # 1. Load Data
+OPTIONS_FILE = 'Trady Flow - Best Options Trade Ideas.csv'
+STUDIES_FILE = 'ctg-studies.csv'
+
+def load_strategy_data():
     print("  Loading Options & Studies...")
     try:
-        options_df = pd.read_csv('Trady Flow - Best Options Trade Ideas.csv')
-        studies_df = pd.read_csv('ctg-studies.csv')
+        options_df = pd.read_csv(OPTIONS_FILE)
+        studies_df = pd.read_csv(STUDIES_FILE)
     except Exception as e:
         print(f"Error loading files: {e}")
-        return
+        return None, None
 
     # Preprocess
     options_df['Time'] = pd.to_datetime(options_df['Time'])
-    
-    def parse_value(x):
-        if isinstance(x, str):
-            x = x.replace(',', '')
-            if 'K' in x: return float(x.replace('K', '')) * 1000
-            if 'M' in x: return float(x.replace('M', '')) * 1000000
-        return float(x)
+    return options_df, studies_df
 
+def select_trades(options_df, config):
     options_df['Vol_Num'] = options_df['Vol'].apply(parse_value)
+
+    # Collapse sweeps into orders so one institution doesn't fill up the top 200.
+    # This runs on the whole flow (not per shard) because the top 200 cut below needs
+    # every order, so every shard has to cluster everything to agree on the same list.
+    gap_minutes = config.get('cluster_gap_minutes', 0)
+    if gap_minutes:
+        # Premiums only matter here as an order total
+        options_df['Prems_Num'] = options_df['Prems'].apply(parse_value)
+    orders = clustering.cluster_prints(options_df, gap_minutes)
     
     # Filter for High Volume (Unusual Activity)
-    unusual_options = options_df[options_df['Vol_Num'] >= CONFIG['volume_threshold']]
+    unusual_options = orders[orders['Vol_Num'] >= config['volume_threshold']]
     print(f"  Found {len(unusual_options)} unusual options trades.")
-    
-    # 2. Map Tickers to Sponsors (Build Universe)
-    ticker_map_full = get_sec_ticker_map_with_cik()
-    
-    # Create a simplified set of "Biotech Company Names" from studies for fast lookup
-    # Because there are thousands of rows, matching every option trade against every study row is O(N*M)
-    # Optimization: Only check options for tickers that "match" a study sponsor.
-    
-    # Simplified approach for demo: Iterate Options, Check if Ticker is in Biotech Universe (Studies)
-    # We do this by checking if the Ticker's Company Name roughly matches ANY sponsor in studies
-    
-    # To save time, let's just create a cache of Ticker -> IsBiotech
-    # TODO: This is an expensive operation. Ideally we pre-compute it and save to a JSON.
-    
-    print("  Matching Options to Biotech Universe (this might take a sec)...")
-    
-    valid_studies = studies_df.dropna(subset=['Sponsor'])
-    unique_sponsors = valid_studies['Sponsor'].apply(clean_company_name).unique()
-    
-    results = []
-    
+
     # Limit number of trades for the demo execution to avoid timeout
     # We prioritize the most recent ones or highest volume
     # UPDATE: bumped to 200 to get better signals
-    trades_to_process = unusual_options.sort_values('Vol_Num', ascending=False).head(200) 
-    
-    print(f"  Processing top {len(trades_to_process)} highest volume trades...")
+    # NOTE: this (and the clustering above) has to happen before sharding so every shard
+    # agrees on the same top 200
+    top_trades = unusual_options.sort_values('Vol_Num', ascending=False).head(200)
+    return top_trades.assign(Rank=range(len(top_trades)))
+
+def scan_trades(trades_to_process, ticker_map_full, unique_sponsors, config):
+    """
+    Biotech check -> SEC silence check -> price simulation for each trade.
+    Returns a list of (rank, signal) where rank is the trade's position in the full
+    volume ranking, so sharded runs can be merged back into the same order.
+    """
+    results = []
     
     for index, row in trades_to_process.iterrows():
         ticker = row['Sym']
@@ -252,12 +190,12 @@ def run_strategy():
             
             # Execute Backtest Logic
             hist_start = trade_date
-            hist_end = trade_date + timedelta(days=CONFIG['holding_period_days'] + 10)
+            hist_end = trade_date + timedelta(days=config['holding_period_days'] + 10)
             hist = get_price_data(ticker, hist_start, hist_end)
             
             if hist is not None and not hist.empty:
                 entry_price = hist.iloc[0]['Close']
-                exit_price = hist.iloc[min(len(hist)-1, CONFIG['holding_period_days'])]['Close']
+                exit_price = hist.iloc[min(len(hist)-1, config['holding_period_days'])]['Close']
                 
                 pnl_pct = (exit_price - entry_price) / entry_price
                 if row['C/P'] == 'Put':
@@ -274,8 +212,10 @@ def run_strategy():
                 # If PnL > 10%, conviction is high.
                 conviction = min(99, int(abs(pnl_pct * 100) * 2 + 50)) 
                 
-                results.append({
-                    'id': f"sig-{index}-{int(time.time())}", # Unique ID for React Key
+                results.append((row['Rank'], {
+                    # Unique ID for React Key. Uses the trade time instead of the wall clock
+                    # so sharded and single process runs give identical output.
+                    'id': f"sig-{index}-{int(trade_date.timestamp())}",
                     'ticker': ticker,
                     'price': f"{entry_price:.2f}",
                     'size': int(row['Vol_Num']), 
@@ -284,10 +224,52 @@ def run_strategy():
                     'conviction': conviction,
                     'timestamp': trade_date.strftime("%H:%M:%S"),
                     'pnl_pct': pnl_pct * 100 # Keep for reference
-                })
+                }))
             else:
                  print("    -> No price data.")
 
+    return results
+
+def run_strategy_shard(shard_index=0, num_shards=1, config=None):
+    """
+    Loads everything and scans only the tickers that hash into this shard.
+    With num_shards=1 that's just the whole top 200.
+    """
+    if config is None:
+        config = load_config(section=CONFIG_SECTION)
+
+    # Every shard hits EDGAR at the same time, so each one slows down to keep the total under SEC's limit
+    set_rate_limit_shards(num_shards)
+
+    options_df, studies_df = load_strategy_data()
+    if options_df is None:
+        return []
+
+    trades_to_process = sharding.partition(select_trades(options_df, config), num_shards, shard_index)
+    
+    # 2. Map Tickers to Sponsors (Build Universe)
+    ticker_map_full = get_sec_ticker_map_with_cik()
+    
+    # Create a simplified set of "Biotech Company Names" from studies for fast lookup
+    # Because there are thousands of rows, matching every option trade against every study row is O(N*M)
+    # Optimization: Only check options for tickers that "match" a study sponsor.
+    
+    # Simplified approach for demo: Iterate Options, Check if Ticker is in Biotech Universe (Studies)
+    # We do this by checking if the Ticker's Company Name roughly matches ANY sponsor in studies
+    
+    # To save time, let's just create a cache of Ticker -> IsBiotech
+    # TODO: This is an expensive operation. Ideally we pre-compute it and save to a JSON.
+    
+    print("  Matching Options to Biotech Universe (this might take a sec)...")
+    
+    valid_studies = studies_df.dropna(subset=['Sponsor'])
+    unique_sponsors = valid_studies['Sponsor'].apply(clean_company_name).unique()
+    
+    print(f"  Processing top {len(trades_to_process)} highest volume trades...")
+
+    return scan_trades(trades_to_process, ticker_map_full, unique_sponsors, config)
+
+def save_signals(results):
     # Save
     if results:
         # Save CSV
@@ -310,5 +292,24 @@ def run_strategy():
     else:
         print("\nNo valid trades found meeting criteria.")
 
+def run_strategy(args=None, config=None):
+    print("Initializing Strategy: 'Unusual Options with NO News'...")
+
+    if args is None:
+        args = argparse.Namespace(shards=1, shard_index=None, workers=None, merge=False, shard_dir=sharding.SHARD_DIR)
+
+    if config is None:
+        config = load_config(section=CONFIG_SECTION)
+    fingerprint = sharding.run_fingerprint(config, [OPTIONS_FILE, STUDIES_FILE])
+    # Ticker map gets loaded (and cached) once up front instead of by every worker at once
+    results = sharding.run_sharded(partial(run_strategy_shard, config=config), 'strategy', args,
+                                   fingerprint=fingerprint, prepare=get_sec_ticker_map_with_cik)
+
+    # Only the merge step (or a plain run) writes the final results
+    if results is not None:
+        save_signals(results)
+
 if __name__ == "__main__":
-    run_strategy()
+    parser = argparse.ArgumentParser(description="'Quiet Options' strategy: unusual options flow with no SEC news")
+    sharding.add_shard_args(parser)
+    run_strategy(parser.parse_args())
@@ -0,0 +1,155 @@
+import json
+import os
+import time
+
+# --- SEC Data & Local Caches ---
+# Shared by backtester.py, news_strategy.py and cli.py.
+# `requests` is only imported when we actually have to hit the network,
+# so checking / reading the caches stays fast.
+
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEC_MAP_FILE = "sec_tickers.json"
+SEC_CIK_MAP_FILE = "sec_tickers_with_cik.json"
+# Need a proper user agent or SEC blocks the request immediately
+USER_AGENT = {'User-Agent': 'RileyResearchBot/1.0 (riley.student@mit.edu)'}
+
+# SEC limit is 10 req/sec for everything coming from us, we aim for ~6.7.
+# Sharded runs have several processes (or nodes) hitting EDGAR at once, so each one
+# waits num_shards times longer (see set_rate_limit_shards).
+EDGAR_REQUEST_DELAY = 0.15
+_rate_limit_shards = 1
+
+def set_rate_limit_shards(num_shards):
+    """
+    Tells this process how many shards share the SEC rate limit.
+    """
+    global _rate_limit_shards
+    _rate_limit_shards = max(1, num_shards)
+
+def _write_json_atomic(path, data):
+    # Temp file + rename so a parallel shard never reads a half-written cache.
+    # pid in the temp name so two writers don't clobber each other's temp file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def get_sec_ticker_map():
+    """
+    Grabs the ticker map from SEC.gov because mapping names manually is a nightmare.
+    Caches it locally so we don't get IP banned.
+    """
+    if os.path.exists(SEC_MAP_FILE):
+        try:
+            with open(SEC_MAP_FILE, 'r') as f:
+                print("Loading ticker map from local cache...")
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading local ticker map: {e}")
+
+    import requests
+
+    print("Fetching ticker map from SEC.gov...")
+    headers = {'User-Agent': 'Mozilla/5.0 (Company; mail@example.com)'} # SEC requires a User-Agent
+    try:
+        response = requests.get(SEC_TICKERS_URL, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Convert SEC format {"0": {...}, "1": {...}} to {"AAPL": "Apple Inc.", ...}
+        ticker_map = {}
+        for key in data:
+            entry = data[key]
+            ticker_map[entry['ticker']] = entry['title']
+            
+        # Save to cache
+        _write_json_atomic(SEC_MAP_FILE, ticker_map)
+            
+        return ticker_map
+    except Exception as e:
+        print(f"Error fetching SEC data: {e}")
+        return {}
+
+def get_sec_ticker_map_with_cik():
+    """
+    Returns dict: Ticker -> {'title': str, 'cik': str}
+    """
+    if os.path.exists(SEC_CIK_MAP_FILE):
+        try:
+            with open(SEC_CIK_MAP_FILE, 'r') as f:
+                return json.load(f)
+        except:
+            pass
+
+    import requests
+
+    print("Fetching ticker map from SEC.gov...")
+    try:
+        response = requests.get(SEC_TICKERS_URL, headers=USER_AGENT)
+        data = response.json()
+        
+        ticker_map = {}
+        for key in data:
+            entry = data[key]
+            # Zero-pad CIK to 10 digits for EDGAR API
+            cik_str = str(entry['cik_str']).zfill(10)
+            ticker_map[entry['ticker']] = {
+                'title': entry['title'],
+                'cik': cik_str
+            }
+            
+        _write_json_atomic(SEC_CIK_MAP_FILE, ticker_map)
+            
+        return ticker_map
+    except Exception as e:
+        print(f"Error fetching SEC data: {e}")
+        return {}
+
+def edgar_cache_file(cik):
+    return f"cache_cik_{cik}.json"
+
+def load_edgar_submissions(cik, save_cache=False):
+    """
+    Returns the EDGAR submissions JSON for a CIK, or None if SEC didn't give us one.
+    Reads the local cache if it's there. Only writes it when save_cache is set
+    (normal runs leave it off to save disk space, `cli.py warm-cache` turns it on).
+    """
+    cache_file = edgar_cache_file(cik)
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+
+    import requests
+
+    # Rate limit compliance (SEC limit is 10 req/sec, we'll go slower just in case)
+    time.sleep(EDGAR_REQUEST_DELAY * _rate_limit_shards)
+    try:
+        r = requests.get(f"https://data.sec.gov/submissions/CIK{cik}.json", headers=USER_AGENT)
+        if r.status_code != 200:
+            return None
+        data = r.json()
+    except:
+        return None
+
+    if save_cache:
+        _write_json_atomic(cache_file, data)
+    return data
+
+def cache_status():
+    """
+    Lists the local caches as (name, path, exists, size_bytes, modified_timestamp).
+    Only touches the filesystem, no network.
+    """
+    status = []
+    for name, path in [('SEC ticker map', SEC_MAP_FILE), ('SEC ticker map (CIK)', SEC_CIK_MAP_FILE)]:
+        if os.path.exists(path):
+            st = os.stat(path)
+            status.append((name, path, True, st.st_size, st.st_mtime))
+        else:
+            status.append((name, path, False, 0, None))
+
+    edgar_files = sorted(f for f in os.listdir('.') if f.startswith('cache_cik_') and f.endswith('.json'))
+    for path in edgar_files:
+        st = os.stat(path)
+        status.append(('EDGAR submissions', path, True, st.st_size, st.st_mtime))
+    return status
@@ -0,0 +1,21 @@
+import json
+
+# --- Config ---
+# Everything reads config.json through here so the scripts (and cli.py) agree on settings.
+# Nested objects are per-strategy overrides, e.g. "quiet_options" for news_strategy.py.
+
+CONFIG_FILE = 'config.json'
+
+def load_config(config_path=CONFIG_FILE, section=None):
+    """
+    Returns the top level settings, with the keys from `section` layered on top if given.
+    """
+    with open(config_path, 'r') as f:
+        raw = json.load(f)
+
+    config = {k: v for k, v in raw.items() if not isinstance(v, dict)}
+    if section:
+        if section not in raw:
+            raise KeyError(f"No '{section}' section in {config_path}")
+        config.update(raw[section])
+    return config
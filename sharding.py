@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import pickle
+import zlib
+
+# --- Ticker Sharding ---
+# Splits the flow by Sym so each chunk can run on its own core (or on another box
+# pointed at the same shared folder), then stitches the outputs back together in
+# the original row order so the merged results match a normal single process run.
+
+SHARD_DIR = "shards"
+
+def shard_of(ticker, num_shards):
+    # Can't use hash() here, it's salted per process so two nodes would disagree.
+    # crc32 gives the same bucket everywhere.
+    return zlib.crc32(str(ticker).encode('utf-8')) % num_shards
+
+def partition(df, num_shards, shard_index):
+    """
+    Returns only the rows whose Sym lands in this shard.
+    Every print for a ticker ends up in the same shard.
+    """
+    if num_shards <= 1:
+        return df
+    mask = df['Sym'].map(lambda t: shard_of(t, num_shards)) == shard_index
+    return df[mask]
+
+def shard_path(prefix, shard_index, num_shards, shard_dir=SHARD_DIR):
+    return os.path.join(shard_dir, f"{prefix}_{shard_index:04d}_of_{num_shards:04d}.pkl")
+
+def run_fingerprint(config, input_files):
+    """
+    Short hash of the config plus each input file's size and mtime.
+    Stored in every shard so --merge can tell if the shards came from the same setup.
+    """
+    h = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+    for path in input_files:
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+        else:
+            h.update(f"{path}:missing".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+def write_shard(rows, prefix, shard_index, num_shards, shard_dir=SHARD_DIR, fingerprint=None):
+    """
+    Saves one shard's output: a small header (with the run fingerprint) and a list of
+    (row_key, record) tuples.
+    Written to a temp file first so a half-finished shard never looks done to the merge step.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    path = shard_path(prefix, shard_index, num_shards, shard_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'fingerprint': fingerprint, 'rows': rows}, f)
+    os.replace(tmp_path, path)
+    return path
+
+def merge_shards(prefix, num_shards, shard_dir=SHARD_DIR, fingerprint=None):
+    """
+    Loads every shard output and puts the records back in original row order.
+    Raises FileNotFoundError if any shard hasn't finished yet, and ValueError if a shard
+    was made with a different config / input file than this run (or than the other shards).
+    """
+    missing = [shard_path(prefix, i, num_shards, shard_dir) for i in range(num_shards)
+               if not os.path.exists(shard_path(prefix, i, num_shards, shard_dir))]
+    if missing:
+        raise FileNotFoundError(f"Missing shard outputs: {', '.join(missing)}")
+
+    rows = []
+    mismatched = []
+    for i in range(num_shards):
+        path = shard_path(prefix, i, num_shards, shard_dir)
+        with open(path, 'rb') as f:
+            shard = pickle.load(f)
+        if not isinstance(shard, dict) or shard.get('fingerprint') != fingerprint:
+            mismatched.append(path)
+            continue
+        rows.extend(shard['rows'])
+
+    if mismatched:
+        raise ValueError(f"Shards made with a different config or input file (expected {fingerprint}): "
+                         f"{', '.join(mismatched)}. Rerun them before merging.")
+
+    # Row keys are the original frame index, so sorting restores single-process order
+    rows.sort(key=lambda r: r[0])
+    return [record for _, record in rows]
+
+def add_shard_args(parser):
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Number of ticker shards to split the flow into (default: 1, no sharding)")
+    parser.add_argument('--shard-index', type=int, default=None,
+                        help="Only run this one shard and write its output (for running shards on other nodes)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Local worker processes when running all shards (default: one per core)")
+    parser.add_argument('--merge', action='store_true',
+                        help="Skip processing and just merge finished shard outputs")
+    parser.add_argument('--shard-dir', default=SHARD_DIR,
+                        help=f"Folder for shard outputs, should be on the shared filesystem (default: {SHARD_DIR})")
+
+def _run_and_write(run_shard, prefix, shard_index, num_shards, shard_dir, fingerprint=None):
+    rows = run_shard(shard_index, num_shards)
+    return write_shard(rows, prefix, shard_index, num_shards, shard_dir, fingerprint)
+
+def run_sharded(run_shard, prefix, args, fingerprint=None, prepare=None):
+    """
+    Drives a sharded run based on the CLI args.
+    run_shard(shard_index, num_shards) must return a list of (row_key, record) tuples
+    and has to be a module level function (or partial) so worker processes can pickle it.
+    fingerprint (see run_fingerprint) gets written into every shard and checked on merge.
+    prepare() runs once in this process before the local worker pool starts, e.g. to fill
+    shared caches so the workers don't all download and write them at the same time.
+
+    Returns the merged records, or None when only a single shard was run (or the merge failed).
+    """
+    num_shards = args.shards
+    if num_shards < 1:
+        raise ValueError("--shards must be at least 1")
+
+    # No sharding at all, just run in this process like before
+    if num_shards == 1 and args.shard_index is None and not args.merge:
+        return [record for _, record in run_shard(0, 1)]
+
+    # Node mode: run one shard and leave the output for the merge step
+    if args.shard_index is not None:
+        if not 0 <= args.shard_index < num_shards:
+            raise ValueError(f"--shard-index must be between 0 and {num_shards - 1}")
+        path = _run_and_write(run_shard, prefix, args.shard_index, num_shards, args.shard_dir, fingerprint)
+        print(f"Shard {args.shard_index + 1}/{num_shards} saved to {path}")
+        return None
+
+    if not args.merge:
+        # Imported here so the CLI doesn't pay for multiprocessing on quick commands
+        from multiprocessing import Pool
+
+        if prepare is not None:
+            prepare()
+
+        workers = args.workers or min(num_shards, os.cpu_count() or 1)
+        print(f"Running {num_shards} shards on {workers} worker processes...")
+        jobs = [(run_shard, prefix, i, num_shards, args.shard_dir, fingerprint) for i in range(num_shards)]
+        with Pool(workers) as pool:
+            pool.starmap(_run_and_write, jobs)
+
+    print(f"Merging {num_shards} shards from {args.shard_dir}...")
+    try:
+        return merge_shards(prefix, num_shards, args.shard_dir, fingerprint)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error merging shards: {e}")
+        return None